@@ -1,22 +1,71 @@
 import argparse
+import atexit
 import logging
 import os
 import sys
-from datetime import datetime
+import time
+from multiprocessing import shared_memory
 
 import cv2
-import yaml
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 
-config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "camera-module-config.yaml")
-with open(config_path, "r") as file:
-    config = yaml.safe_load(file)
 
-SAVE_DIR = config["camera_api"]["SAVE_DIR"]
+def _load_config():
+    import yaml  # deferred: only parsed when no env override is present
+
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "..", "camera-module-config.yaml")
+    with open(config_path, "r") as file:
+        return yaml.safe_load(file)
+
+
+# Resolve configuration once at import. Env vars, when present, are
+# authoritative; the yaml is only parsed for values no env var supplies,
+# which matters when the script is spawned per command.
+SAVE_DIR = os.environ.get("MMP_SAVE_DIR")
+# Optional zero-copy hand-off: write raw BGR frames into a shared-memory
+# ring buffer instead of JPEGs on disk. Consumers get a shm:// token per
+# frame and map the slot directly (see ml_inference._load_shm_frame).
+if "MMP_USE_SHM" in os.environ:
+    USE_SHM = os.environ["MMP_USE_SHM"].lower() in {"1", "true", "yes"}
+else:
+    USE_SHM = None
+if SAVE_DIR is None or USE_SHM is None:
+    _config = _load_config()
+    if SAVE_DIR is None:
+        SAVE_DIR = _config["camera_api"]["SAVE_DIR"]
+    if USE_SHM is None:
+        USE_SHM = bool(_config["camera_api"].get("USE_SHM", False))
+
+SAVE_DIR = os.path.abspath(SAVE_DIR)
 os.makedirs(SAVE_DIR, exist_ok=True)
+FRAME_PATH_PREFIX = os.path.join(SAVE_DIR, "frame_")
+
+SHM_SLOTS = 8
+
+# Quality 85 roughly halves encode time and bytes written versus the
+# libjpeg default of 95, with negligible visual impact for detection.
+JPEG_QUALITY = 85
+_JPEG_WRITE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+
+try:
+    # libjpeg-turbo uses SIMD DCT kernels; optional, cv2 path works without it.
+    from turbojpeg import TurboJPEG
+    _turbojpeg = TurboJPEG()
+except Exception:
+    _turbojpeg = None
 
 camera = None
+shm = None
+shm_frame_shape = None
+shm_next_slot = 0
+# The ring buffer is reused across capture sessions; a segment is only
+# retired when the frame shape changes, and retirees are unlinked as soon
+# as the next segment exists (the Java orchestration stops the camera
+# before ml_inference maps the frames, so unlinking on stop is too early).
+shm_retired = []
 
 
 def start_camera():
@@ -38,14 +87,69 @@ def start_camera():
 def stop_camera():
     global camera
     if camera is None:
+        _release_shm()
         return True, "Camera already stopped."
 
     if camera.isOpened():
         camera.release()
     camera = None
+    _release_shm()
     return True, "Camera stopped."
 
 
+def _release_shm():
+    """Reset the ring for the next session. The segment itself stays alive
+    and is reused: consumers attach by name after the camera stops, so it
+    must outlive the capture session, and reallocating per session would
+    leak one ring per ambiguity event in this long-lived process."""
+    global shm_next_slot
+    shm_next_slot = 0
+
+
+def _drain_retired_shm():
+    while shm_retired:
+        segment = shm_retired.pop()
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@atexit.register
+def _unlink_shm_segments():
+    _drain_retired_shm()
+    if shm is not None:
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _write_frame_to_shm(frame):
+    """Copy a frame into the next ring-buffer slot; returns its shm:// token."""
+    global shm, shm_frame_shape, shm_next_slot
+    if shm is not None and frame.shape != shm_frame_shape:
+        # Resolution changed: retire the old ring and start a new one; any
+        # earlier retiree has been consumed by now, so unlink it here.
+        _drain_retired_shm()
+        shm_retired.append(shm)
+        shm = None
+    if shm is None:
+        shm = shared_memory.SharedMemory(create=True, size=frame.nbytes * SHM_SLOTS)
+        shm_frame_shape = frame.shape
+        shm_next_slot = 0
+
+    slot = shm_next_slot % SHM_SLOTS
+    shm_next_slot += 1
+    view = np.ndarray(shm_frame_shape, dtype=np.uint8,
+                      buffer=shm.buf, offset=slot * frame.nbytes)
+    view[:] = frame
+    h, w, c = shm_frame_shape
+    return f"shm://{shm.name}?shape={h}x{w}x{c}&slot={slot}"
+
+
 def capture_frame():
     global camera
     if camera is None or not camera.isOpened():
@@ -59,9 +163,13 @@ def capture_frame():
         logging.error(message)
         return False, message
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-    filepath = os.path.abspath(os.path.join(SAVE_DIR, f"frame_{timestamp}.jpg"))
-    if not cv2.imwrite(filepath, frame):
+    if USE_SHM:
+        return True, _write_frame_to_shm(frame)
+
+    now = time.time()
+    timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now))
+    filepath = f"{FRAME_PATH_PREFIX}{timestamp}_{int(now * 1000) % 1000:03d}.jpg"
+    if not _write_jpeg(filepath, frame):
         message = "Failed to write frame to disk."
         logging.error(message)
         return False, message
@@ -69,6 +177,17 @@ def capture_frame():
     return True, filepath
 
 
+def _write_jpeg(filepath, frame):
+    if _turbojpeg is not None:
+        try:
+            with open(filepath, "wb") as out:
+                out.write(_turbojpeg.encode(frame, quality=JPEG_QUALITY))
+            return True
+        except OSError:
+            return False
+    return cv2.imwrite(filepath, frame, _JPEG_WRITE_PARAMS)
+
+
 def execute_command(command: str):
     command = command.strip().lower()
     if command == "start":
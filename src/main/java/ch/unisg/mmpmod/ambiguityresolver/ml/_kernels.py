@@ -0,0 +1,86 @@
+"""
+_kernels.py
+-----------------------------------------------------------
+Numba-compiled inner kernels for the microactivity detector.
+
+Holds the glove/object contact-metric kernel operating on bit-packed
+uint8 masks and float64 xyxy boxes. Numba is optional: when it is not
+installed, HAVE_NUMBA is False and the detector keeps its NumPy path.
+-----------------------------------------------------------
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:  # numba is an optional acceleration dependency
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        return wrap
+
+    prange = range
+
+
+# Popcount lookup shared with the pure-NumPy path in microactivity_detector.
+_POPCOUNT_LUT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+@njit(parallel=True, cache=True)
+def contact_metrics(glove_mask_packed, glove_box, obj_masks_packed, obj_boxes,
+                    img_diag, alpha=0.7):
+    """
+    Fused (mask + box) IoU mean and minimum normalized center distance
+    between the merged glove and one class of objects.
+
+    :param glove_mask_packed: (H, W//8) uint8 bit-packed glove mask.
+    :param glove_box: (4,) float64 xyxy box of the merged gloves.
+    :param obj_masks_packed: (N, H, W//8) uint8 bit-packed object masks.
+    :param obj_boxes: (N, 4) float64 xyxy object boxes.
+    :return: (mean fused IoU, min center distance / image diagonal).
+    """
+    n = obj_masks_packed.shape[0]
+    h = glove_mask_packed.shape[0]
+    wb = glove_mask_packed.shape[1]
+
+    glove_area = 0
+    for y in range(h):
+        for x in range(wb):
+            glove_area += _POPCOUNT_LUT[glove_mask_packed[y, x]]
+
+    g_cx = (glove_box[0] + glove_box[2]) * 0.5
+    g_cy = (glove_box[1] + glove_box[3]) * 0.5
+    g_area = (glove_box[2] - glove_box[0]) * (glove_box[3] - glove_box[1])
+
+    ious = np.empty(n, np.float64)
+    dists = np.empty(n, np.float64)
+    for i in prange(n):
+        inter = 0
+        area = 0
+        for y in range(h):
+            for x in range(wb):
+                v = obj_masks_packed[i, y, x]
+                area += _POPCOUNT_LUT[v]
+                inter += _POPCOUNT_LUT[v & glove_mask_packed[y, x]]
+        union = glove_area + area - inter
+        iou_mask = inter / (union + 1e-6)
+
+        b = obj_boxes[i]
+        ix1 = max(glove_box[0], b[0])
+        iy1 = max(glove_box[1], b[1])
+        ix2 = min(glove_box[2], b[2])
+        iy2 = min(glove_box[3], b[3])
+        inter_box = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+        b_area = (b[2] - b[0]) * (b[3] - b[1])
+        iou_box = inter_box / (g_area + b_area - inter_box + 1e-6)
+
+        ious[i] = alpha * iou_mask + (1 - alpha) * iou_box
+
+        b_cx = (b[0] + b[2]) * 0.5
+        b_cy = (b[1] + b[3]) * 0.5
+        dists[i] = ((g_cx - b_cx) ** 2 + (g_cy - b_cy) ** 2) ** 0.5 / (img_diag + 1e-6)
+
+    return ious.mean(), dists.min()
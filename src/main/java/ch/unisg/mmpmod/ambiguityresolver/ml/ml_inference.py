@@ -1,42 +1,97 @@
 import json
 import logging
+import os
 import sys
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client
 from pathlib import Path
 from typing import Iterable, List
+from urllib.parse import parse_qs, urlparse
 
 import cv2
 import numpy as np
 
 # from ml_api.ml_model import model  # import fine-tuned model
-from microactivity_detector import MicroactivityDetector
 
-detector = MicroactivityDetector(model_path="YOLO-model/best.pt", debug=False)
+# Unix socket of the optional long-lived inference server (ml_inference_server.py)
+SOCKET_PATH = os.environ.get(
+    "MMP_ML_SOCKET",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ml_inference.sock"),
+)
 
+_detector = None
 
-def _to_frame_list(frame_paths) -> List[str]:
-    """Ensure frame paths are returned as a non-empty list of strings."""
 
+def _get_detector():
+    """Create the detector on first use; importing torch/ultralytics and
+    loading best.pt take seconds, so the server-delegating path skips both."""
+
+    global _detector
+    if _detector is None:
+        from microactivity_detector import MicroactivityDetector
+
+        _detector = MicroactivityDetector(model_path="YOLO-model/best.pt", debug=False)
+    return _detector
+
+
+def _normalize_frame_ref(frame) -> str:
+    """Normalize one frame reference; shm:// tokens must bypass Path(),
+    which would collapse their double slash and break token detection."""
+
+    frame = str(frame)
+    return frame if frame.startswith("shm://") else str(Path(frame))
+
+
+def _to_frame_list(frame_paths) -> List:
+    """Ensure frames are returned as a non-empty list of paths or BGR arrays."""
+
+    if isinstance(frame_paths, np.ndarray):
+        return [frame_paths]
     if isinstance(frame_paths, (str, Path)):
-        frame_list: Iterable[str] = [str(frame_paths)]
+        frame_list: Iterable = [str(frame_paths)]
     elif isinstance(frame_paths, Iterable):
-        frame_list = [str(Path(p)) for p in frame_paths]
+        frame_list = [f if isinstance(f, np.ndarray) else _normalize_frame_ref(f) for f in frame_paths]
     else:
         return []
 
-    return [p for p in frame_list if p]
+    return [f for f in frame_list if isinstance(f, np.ndarray) or f]
+
+
+def _load_shm_frame(token: str) -> np.ndarray:
+    """Materialize a BGR frame from a shm:// ring-buffer token issued by camera.py."""
+
+    parsed = urlparse(token)
+    params = parse_qs(parsed.query)
+    shape = tuple(int(d) for d in params["shape"][0].split("x"))
+    slot = int(params.get("slot", ["0"])[0])
+
+    # track=False (Python 3.13): the camera owns the segment's lifetime;
+    # without it this consumer's resource tracker unlinks the segment from
+    # /dev/shm when the process exits, destroying rings still in use.
+    shm = shared_memory.SharedMemory(name=parsed.netloc, track=False)
+    try:
+        nbytes = int(np.prod(shape))
+        frame = np.ndarray(shape, dtype=np.uint8,
+                           buffer=shm.buf, offset=slot * nbytes).copy()
+    finally:
+        shm.close()
+    return frame
 
 
 def model_inference(frame_paths, use_raul=True):
     """
     Unified inference function allowing to switch between Sejma’s and Raúl’s models.
+    Frames may be file paths or preloaded BGR ndarrays.
     """
 
     if use_raul:
         # Run Raúl's YOLOv11 segmentation-based microactivity detector
         if not frame_paths:
             return {"error": "No image found!"}
+        frame_paths = [_load_shm_frame(f) if isinstance(f, str) and f.startswith("shm://") else f
+                       for f in frame_paths]
         #print("[INFO] Using Raúl’s YOLOv11 segmentation model...")
-        result = detector.infer_frames(frame_paths)  # process up to 5 frames
+        result = _get_detector().infer_frames(frame_paths)  # process up to 5 frames
         return result
 
 def format_model_output(results, frame_paths):
@@ -73,13 +128,31 @@ def format_model_output(results, frame_paths):
     }
 
 
+def _try_server_inference(frames):
+    """Delegate to a running ml_inference_server; returns None when unavailable."""
+
+    if not os.path.exists(SOCKET_PATH):
+        return None
+    try:
+        with Client(SOCKET_PATH, family="AF_UNIX") as conn:
+            conn.send(frames)
+            return conn.recv()
+    except (OSError, EOFError) as exc:
+        logging.warning("Inference server unreachable (%s); loading model locally.", exc)
+        return None
+
+
 def main():
     logging.basicConfig(level=logging.INFO)
     try:
         frames = _to_frame_list(sys.argv[1:])
         if not frames:
             raise ValueError("No valid frame paths provided")
-        result = model_inference(frames, use_raul=True)
+        # Prefer the persistent server so model weights and the CUDA context
+        # are not re-initialized on every invocation.
+        result = _try_server_inference(frames)
+        if result is None:
+            result = model_inference(frames, use_raul=True)
         print(json.dumps(result))
     except Exception as exc:  # pylint: disable=broad-except
         logging.exception("Inference failed: %s", exc)
@@ -0,0 +1,55 @@
+"""
+ml_inference_server.py
+-----------------------------------------------------------
+Long-lived inference server for the microactivity detector.
+
+Loads the YOLOv11 model once and serves frame lists received over a Unix
+socket (multiprocessing.connection), so the weights and CUDA context are
+amortized across invocations instead of being re-initialized per call.
+ml_inference.py transparently becomes a thin client while the server is
+running; when it is not, the per-invocation path still works.
+
+Usage:
+    python ml_inference_server.py
+-----------------------------------------------------------
+"""
+
+import logging
+import os
+from multiprocessing.connection import Listener
+
+from ml_inference import SOCKET_PATH, _get_detector, model_inference
+
+
+def serve():
+    logging.basicConfig(level=logging.INFO)
+
+    # Load the model up front so the first request does not pay for it
+    _get_detector()
+
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+
+    with Listener(SOCKET_PATH, family="AF_UNIX") as listener:
+        logging.info("Inference server listening on %s", SOCKET_PATH)
+        while True:
+            with listener.accept() as conn:
+                try:
+                    frames = conn.recv()
+                    conn.send(model_inference(frames, use_raul=True))
+                except EOFError:
+                    continue
+                except Exception as exc:  # pylint: disable=broad-except
+                    logging.exception("Inference request failed: %s", exc)
+                    try:
+                        conn.send({"error": str(exc)})
+                    except OSError:
+                        pass
+
+
+if __name__ == "__main__":
+    try:
+        serve()
+    finally:
+        if os.path.exists(SOCKET_PATH):
+            os.unlink(SOCKET_PATH)